@@ -1,17 +1,31 @@
+import socketserver
 import threading
 import time
-from xmlrpc.server import SimpleXMLRPCServer
+from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
 import xmlrpc.client
 
 
+class KeepAliveRequestHandler(SimpleXMLRPCRequestHandler):
+    # HTTP/1.1 lets a cached client proxy reuse its connection
+    protocol_version = "HTTP/1.1"
+
+
+class ThreadedXMLRPCServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    # a kept-alive connection must not block every other peer
+    daemon_threads = True
+
+
 class LamportClock:
     def __init__(self, port):
         self.port = port
         self.clock = 0
         self.lock = threading.Lock()
+        # one cached proxy (and so one HTTP connection) per remote port
+        self._proxies = {}
 
         # XML-RPC server setup
-        self.server = SimpleXMLRPCServer(('localhost', self.port), allow_none=True)
+        self.server = ThreadedXMLRPCServer(('localhost', self.port), requestHandler=KeepAliveRequestHandler,
+                                           allow_none=True)
         self.server.register_function(self.receive_message, "receive_message")
 
     def receive_message(self, message):
@@ -28,18 +42,26 @@ class LamportClock:
                 print(f"Process {self.port}: Internal event, clock is now {self.clock}")
             time.sleep(1)
 
+    def _proxy(self, remote_port):
+        proxy = self._proxies.get(remote_port)
+        if proxy is None:
+            proxy = xmlrpc.client.ServerProxy(f"http://localhost:{remote_port}/")
+            self._proxies[remote_port] = proxy
+        return proxy
+
     def send_message(self, remote_port):
-        with xmlrpc.client.ServerProxy(f"http://localhost:{remote_port}/") as remote_server:
-            with self.lock:
-                message = {
-                    'sender_port': self.port,
-                    'clock': self.clock
-                }
-            try:
-                remote_server.receive_message(message)
-                print(f"Process {self.port}: Sent to {remote_port} with clock {self.clock}")
-            except ConnectionRefusedError as ce:
-                print(f"Process at {remote_port} is dead!!")
+        remote_server = self._proxy(remote_port)
+        with self.lock:
+            message = {
+                'sender_port': self.port,
+                'clock': self.clock
+            }
+        try:
+            remote_server.receive_message(message)
+            print(f"Process {self.port}: Sent to {remote_port} with clock {self.clock}")
+        except ConnectionRefusedError as ce:
+            self._proxies.pop(remote_port, None)
+            print(f"Process at {remote_port} is dead!!")
 
 
     def start(self):
@@ -0,0 +1,37 @@
+# Static declarations for compiling vector_clock_process.py with Cython:
+#
+#     cythonize -i vector_clock_process.py
+#
+# Cython picks this file up next to the .py and turns VectorClock into an
+# extension type with typed attributes and loop indices. The .py stays the
+# single source; without a compiled module Python just imports it as usual.
+
+cimport cython
+
+
+cdef class VectorClock:
+    cdef public object process_id
+    cdef public list clock
+    cdef object _snap
+    cdef readonly Py_ssize_t _version
+    cdef tuple _cmp_cache
+    cdef Py_ssize_t _own_idx
+
+    cpdef Py_ssize_t _find(self, process_id)
+
+    @cython.locals(local=list, n_local=Py_ssize_t, i=Py_ssize_t)
+    cpdef bint _dominates(self, list other)
+
+    @cython.locals(i=Py_ssize_t)
+    cpdef increment(self)
+
+    @cython.locals(local=list, other=list, merged=list, entry_a=tuple, entry_b=tuple,
+                   n_local=Py_ssize_t, n_other=Py_ssize_t, i=Py_ssize_t, j=Py_ssize_t, k=Py_ssize_t)
+    cpdef update(self, received_clock)
+
+    @cython.locals(cache=tuple)
+    cpdef compare(self, other_clock)
+
+    @cython.locals(local=list, n_local=Py_ssize_t, n_other=Py_ssize_t,
+                   i=Py_ssize_t, j=Py_ssize_t, less_than_all=bint, greater_than_all=bint)
+    cpdef _compare_entries(self, list other)
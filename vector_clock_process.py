@@ -1,3 +1,24 @@
+import bisect
+import collections.abc
+
+
+class ClockSnapshot(dict):
+    """
+    Read-only dict returned by VectorClock.get_clock().
+    It still pickles, copies and serializes to JSON like a plain dict.
+    """
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("clock snapshots are read-only")
+    
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    
+    def __reduce__(self):
+        # Rebuild from a plain dict instead of item by item, which __setitem__ refuses
+        return type(self), (dict(self),)
+
+
 class VectorClock:
     """
     A vector clock implementation for distributed systems.
@@ -13,15 +34,59 @@ class VectorClock:
             initial_clock: Optional initial state (dict mapping process_id -> counter)
         """
         self.process_id = process_id
-        self.clock = initial_clock.copy() if initial_clock else {}
+        # Stored as a list of (process_id, counter) tuples sorted by process_id
+        self.clock = sorted(initial_clock.items()) if initial_clock else []
         # Ensure our own process is in the clock
-        if self.process_id not in self.clock:
-            self.clock[self.process_id] = 0
+        i = self._find(self.process_id)
+        if i == len(self.clock) or self.clock[i][0] != self.process_id:
+            self.clock.insert(i, (self.process_id, 0))
+        # Position of our own entry, so increment() needs no search
+        self._own_idx = i
+        # Cached snapshot returned by get_clock(), rebuilt after the next change
+        self._snap = None
+        # Bumped on every change; keys the last compare() against a VectorClock
+        self._version = 0
+        self._cmp_cache = None
+    
+    def _find(self, process_id):
+        """Return the index where process_id is (or would be) in the clock."""
+        return bisect.bisect_left(self.clock, (process_id,))
+    
+    @staticmethod
+    def _entries(other_clock):
+        """Return other_clock as a sorted list of (process_id, counter) tuples."""
+        if isinstance(other_clock, VectorClock):
+            # Already stored sorted, nothing to rebuild
+            return other_clock.clock
+        # Snapshots from get_clock() are in process_id order, so this sort
+        # only has to confirm a single run
+        return sorted(other_clock.items())
+    
+    def _dominates(self, other):
+        """
+        Check whether sorted entries other only hold known processes with
+        counters <= ours (our own included), i.e. a merge would change
+        nothing, as for duplicates, echoes and retransmits.
+        """
+        local = self.clock
+        n_local = len(local)
+        i = 0
+        for pid, val in other:
+            while i < n_local and local[i][0] < pid:
+                i += 1
+            # A process we have never seen still has to be merged in
+            if i == n_local or local[i][0] != pid or local[i][1] < val:
+                return False
+        return True
     
     def increment(self):
         """Increment this process's counter in the vector clock."""
-        self.clock[self.process_id] += 1
-        return self.clock[self.process_id]
+        i = self._own_idx
+        counter = self.clock[i][1] + 1
+        self.clock[i] = (self.process_id, counter)
+        self._snap = None
+        self._version += 1
+        return counter
     
     def update(self, received_clock):
         """
@@ -29,15 +94,49 @@ class VectorClock:
         This implements the vector clock merge: max(local[i], remote[i]) for all i.
         
         Args:
-            received_clock: Another vector clock to merge with
+            received_clock: Another vector clock to merge with (a dict or a VectorClock)
         """
-        # Update with max values for all known processes
-        all_processes = set(self.clock.keys()) | set(received_clock.keys())
+        other = self._entries(received_clock)
+        if self._dominates(other):
+            self.increment()
+            return
+        
+        # Merge-walk both sorted clocks, taking the max for every process
+        # (locals instead of attribute lookups inside the loop)
+        local = self.clock
+        n_local, n_other = len(local), len(other)
+        merged = [None] * (n_local + n_other)
+        i = j = k = 0
         
-        for process_id in all_processes:
-            local_val = self.clock.get(process_id, 0)
-            remote_val = received_clock.get(process_id, 0)
-            self.clock[process_id] = max(local_val, remote_val)
+        while i < n_local and j < n_other:
+            entry_a = local[i]
+            entry_b = other[j]
+            pid_a = entry_a[0]
+            pid_b = entry_b[0]
+            if pid_a == pid_b:
+                merged[k] = entry_a if entry_a[1] >= entry_b[1] else entry_b
+                i += 1
+                j += 1
+            elif pid_a < pid_b:
+                merged[k] = entry_a
+                i += 1
+            else:
+                merged[k] = entry_b
+                j += 1
+            k += 1
+        
+        # Whatever is left over exists on one side only
+        for entry in local[i:] + other[j:]:
+            merged[k] = entry
+            k += 1
+        
+        del merged[k:]
+        if k != n_local:
+            # New processes were merged in, possibly ahead of our own entry
+            self._own_idx = bisect.bisect_left(merged, (self.process_id,))
+        self.clock = merged
+        self._snap = None
+        self._version += 1
         
         # Increment our own counter after receiving a message
         self.increment()
@@ -51,23 +150,63 @@ class VectorClock:
              0: clocks are concurrent
              1: this clock happens after other_clock
             None: clocks are identical
+        
+        The result against a VectorClock is cached until either clock
+        changes, so happens_before/happens_after/is_concurrent on the
+        same pair only walk the clocks once.
         """
-        if self.clock == other_clock:
+        if isinstance(other_clock, VectorClock):
+            cache = self._cmp_cache
+            if (cache is not None and cache[0] is other_clock
+                    and cache[1] == self._version and cache[2] == other_clock._version):
+                return cache[3]
+            result = self._compare_entries(other_clock.clock)
+            self._cmp_cache = (other_clock, self._version, other_clock._version, result)
+            return result
+        return self._compare_entries(self._entries(other_clock))
+    
+    def _compare_entries(self, other):
+        """Compare with sorted (process_id, counter) entries, as compare()."""
+        local = self.clock
+        if local == other:
             return None
         
         less_than_all = True
         greater_than_all = True
+        n_local, n_other = len(local), len(other)
+        i = j = 0
         
-        all_processes = set(self.clock.keys()) | set(other_clock.keys())
-        
-        for process_id in all_processes:
-            local_val = self.clock.get(process_id, 0)
-            other_val = other_clock.get(process_id, 0)
+        # Merge-walk both sorted clocks; a missing entry counts as 0
+        while i < n_local and j < n_other:
+            pid_a, local_val = local[i]
+            pid_b, other_val = other[j]
+            if pid_a == pid_b:
+                i += 1
+                j += 1
+            elif pid_a < pid_b:
+                other_val = 0
+                i += 1
+            else:
+                local_val = 0
+                j += 1
             
             if local_val < other_val:
                 greater_than_all = False
             elif local_val > other_val:
                 less_than_all = False
+            
+            if not less_than_all and not greater_than_all:
+                return 0  # Concurrent, no need to look any further
+        
+        # Entries left over on one side only are compared against 0
+        for _, val in local[i:]:
+            if val:
+                less_than_all = False
+                break
+        for _, val in other[j:]:
+            if val:
+                greater_than_all = False
+                break
         
         if less_than_all and not greater_than_all:
             return -1  # This happens before
@@ -89,17 +228,42 @@ class VectorClock:
         return self.compare(other_clock) == 0
     
     def get_clock(self):
-        """Get a copy of the current clock state."""
-        return self.clock.copy()
+        """
+        Get a snapshot of the current clock state.
+        
+        The snapshot is a read-only dict shared between callers until
+        the clock changes again.
+        """
+        if self._snap is None:
+            self._snap = ClockSnapshot(self.clock)
+        return self._snap
     
     def __str__(self):
         """String representation of the vector clock."""
-        return f"VectorClock(process={self.process_id}, clock={self.clock})"
+        return f"VectorClock(process={self.process_id}, clock={dict(self.clock)})"
     
     def __repr__(self):
         return self.__str__()
 
 
+class MessageLog(collections.abc.Sequence):
+    """
+    Read-only sequence view of a VectorClockProcess's received messages.
+    Each entry is built on access from the process's log columns.
+    """
+    
+    def __init__(self, process):
+        self._process = process
+    
+    def __len__(self):
+        return len(self._process._log_clocks)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._process.log_entry(i) for i in range(len(self))[index]]
+        return self._process.log_entry(index)
+
+
 class VectorClockProcess:
     """
     A process that uses vector clocks for causal ordering in a distributed system.
@@ -114,7 +278,11 @@ class VectorClockProcess:
         """
         self.process_id = process_id
         self.vector_clock = VectorClock(process_id)
-        self.message_log = []  # Store messages with their vector clocks
+        # Received messages stored column-wise: the messages themselves and
+        # the local clock after each one (shared get_clock() snapshots)
+        self._log_messages = []
+        self._log_clocks = []
+        self.message_log = MessageLog(self)  # Read-only view of the log
     
     def send_message(self, message_content, target_process=None):
         """
@@ -138,7 +306,7 @@ class VectorClockProcess:
         }
         
         print(f"Process {self.process_id} sending message: {message_content}")
-        print(f"Current clock: {self.vector_clock.get_clock()}")
+        print(f"Current clock: {dict(self.vector_clock.get_clock())}")
         
         return message
     
@@ -153,28 +321,40 @@ class VectorClockProcess:
             Boolean indicating if message was accepted (for causal ordering)
         """
         print(f"Process {self.process_id} receiving message: {message['content']}")
-        print(f"Received clock: {message['vector_clock']}")
-        print(f"Local clock before update: {self.vector_clock.get_clock()}")
+        print(f"Received clock: {dict(message['vector_clock'])}")
+        print(f"Local clock before update: {dict(self.vector_clock.get_clock())}")
         
         # Update our vector clock with the received clock
         self.vector_clock.update(message['vector_clock'])
         
-        print(f"Local clock after update: {self.vector_clock.get_clock()}")
+        print(f"Local clock after update: {dict(self.vector_clock.get_clock())}")
         
         # Log the message
-        self.message_log.append({
-            'message': message,
-            'local_clock': self.vector_clock.get_clock().copy(),
-            'timestamp': len(self.message_log)
-        })
+        self._log_messages.append(message)
+        self._log_clocks.append(self.vector_clock.get_clock())
         
         return True
     
+    def log_entry(self, timestamp):
+        """
+        Get one logged message by its position in the log.
+        
+        Returns:
+            Dict with the message and our local clock right after receiving it
+        """
+        # Resolves negative positions and raises IndexError when out of range
+        timestamp = range(len(self._log_clocks))[timestamp]
+        return {
+            'message': self._log_messages[timestamp],
+            'local_clock': self._log_clocks[timestamp],
+            'timestamp': timestamp
+        }
+    
     def local_event(self):
         """Perform a local event (increment clock without sending message)."""
         self.vector_clock.increment()
         print(f"Process {self.process_id} local event")
-        print(f"Current clock: {self.vector_clock.get_clock()}")
+        print(f"Current clock: {dict(self.vector_clock.get_clock())}")
     
     def get_clock_state(self):
         """Get current vector clock state."""
@@ -196,9 +376,9 @@ def demo_vector_clocks():
     process_c = VectorClockProcess("C")
     
     print("\n--- Initial State ---")
-    print(f"Process A: {process_a.get_clock_state()}")
-    print(f"Process B: {process_b.get_clock_state()}")
-    print(f"Process C: {process_c.get_clock_state()}")
+    print(f"Process A: {dict(process_a.get_clock_state())}")
+    print(f"Process B: {dict(process_b.get_clock_state())}")
+    print(f"Process C: {dict(process_c.get_clock_state())}")
     
     print("\n--- Process A sends message to B ---")
     message1 = process_a.send_message("Hello from A", "B")
@@ -216,9 +396,9 @@ def demo_vector_clocks():
     process_b.local_event()
     
     print("\n--- Final State ---")
-    print(f"Process A: {process_a.get_clock_state()}")
-    print(f"Process B: {process_b.get_clock_state()}")
-    print(f"Process C: {process_c.get_clock_state()}")
+    print(f"Process A: {dict(process_a.get_clock_state())}")
+    print(f"Process B: {dict(process_b.get_clock_state())}")
+    print(f"Process C: {dict(process_c.get_clock_state())}")
     
     print("\n--- Clock Comparisons ---")
     print(f"A vs B: {process_a.compare_with_other(process_b.get_clock_state())}")
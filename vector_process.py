@@ -1,87 +1,627 @@
+import collections
+import concurrent.futures
+import logging
+import logging.handlers
+import operator
+import queue
+import socket
+import socketserver
+import struct
 import threading
 import time
-from xmlrpc.server import SimpleXMLRPCServer
-import xmlrpc.client
+
+
+log = logging.getLogger(__name__)
+
+
+# Wire format: every frame is a 4-byte big-endian length followed by the
+# payload.  A payload is the sender port, the sender's node count, the
+# sparse bitmap (one bit per node, big-endian) and then one signed 64-bit
+# counter per set bit.  The receiver answers every frame with a single ack
+# byte once it is merged.
+_FRAME_HEADER = struct.Struct('>I')
+_SENDER = struct.Struct('>iH')
+_ACK = b'\x01'
+
+
+def _max_payload(n):
+    """Size of the largest payload for a clock with n entries (all non-zero)."""
+    return _SENDER.size + (n + 7) // 8 + 8 * n
+
+
+def _encode_message(sender_port, sparse, n):
+    """Pack a (sender, sparse clock) message for a clock with n entries into a frame."""
+    bitmap, values = sparse
+    payload = (_SENDER.pack(sender_port, n)
+               + bitmap.to_bytes((n + 7) // 8, 'big')
+               + struct.pack(f'>{len(values)}q', *values))
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _decode_message(payload, n):
+    """
+    Unpack a frame payload into a message dict for a clock with n entries.
+
+    Raises ValueError if the payload is malformed or was encoded for a
+    different node count, whose entries would land in the wrong slots.
+    """
+    if len(payload) < _SENDER.size:
+        raise ValueError(f"truncated frame of {len(payload)} bytes")
+    sender_port, sender_n = _SENDER.unpack_from(payload)
+    if sender_n != n:
+        raise ValueError(f"frame from {sender_port} has {sender_n} entries, expected {n}")
+    start = _SENDER.size
+    end = start + (n + 7) // 8
+    bitmap = int.from_bytes(payload[start:end], 'big')
+    if bitmap >> n or len(payload) != end + 8 * bitmap.bit_count():
+        raise ValueError(f"malformed frame from {sender_port}")
+    values = list(struct.unpack_from(f'>{bitmap.bit_count()}q', payload, end))
+    return {'sender_port': sender_port, 'clock': (bitmap, values)}
+
+
+def _resolve(future, result=None, exception=None):
+    """Complete future unless the caller has already cancelled it."""
+    try:
+        if exception is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exception)
+    except concurrent.futures.InvalidStateError:
+        pass
+
+
+class _FrameHandler(socketserver.StreamRequestHandler):
+    """Reads frames off one persistent peer connection until it closes."""
+
+    def handle(self):
+        vector_clock = self.server.vector_clock
+        n = vector_clock.size
+        max_length = _max_payload(n)
+        # acks go out from this connection's own writer thread, so the next
+        # frame can be read while this one waits for its batch, and a peer
+        # that stops reading acks only stalls itself, never the merge worker
+        merges = queue.SimpleQueue()
+        writer = threading.Thread(target=self._write_acks, args=(merges,), daemon=True)
+        writer.start()
+        try:
+            while True:
+                header = self.rfile.read(_FRAME_HEADER.size)
+                if len(header) < _FRAME_HEADER.size:
+                    return
+                (length,) = _FRAME_HEADER.unpack(header)
+                if length > max_length:
+                    log.warning("Process %s: %d byte frame exceeds %d, dropping connection",
+                                vector_clock.port, length, max_length)
+                    return
+                payload = self.rfile.read(length)
+                if len(payload) < length:
+                    return
+                try:
+                    message = _decode_message(payload, n)
+                except ValueError as e:
+                    # a peer with another layout; closing fails its pending sends
+                    log.warning("Process %s: %s, dropping connection", vector_clock.port, e)
+                    return
+                merges.put(vector_clock.receive_message(message))
+        finally:
+            # finish() closes wfile once handle() returns
+            merges.put(None)
+            writer.join()
+
+    def _write_acks(self, merges):
+        while True:
+            merged = merges.get()
+            if merged is None:
+                return
+            try:
+                merged.result()
+                self.wfile.write(_ACK)
+            except (OSError, ValueError):
+                return  # the peer went away; its pending sends fail on its side
+            except Exception:
+                # the merge failed, so this frame must never be acked: drop
+                # the connection and let the sender fail everything pending
+                try:
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return
+
+
+class _FrameServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _PeerConnection:
+    """
+    A persistent outgoing connection. Frames are written by the caller;
+    a reader thread resolves each frame's future when its ack comes back,
+    in order, since the peer handles one connection's frames in sequence.
+    """
+
+    def __init__(self, remote_port, on_close):
+        self.remote_port = remote_port
+        self.sock = socket.create_connection(('localhost', remote_port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._on_close = on_close
+        self._pending = collections.deque()
+        # keeps frame order on the wire and in _pending the same, and makes
+        # closing atomic with respect to send()
+        self._send_lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._read_acks, daemon=True).start()
+
+    def send(self, frame, future):
+        with self._send_lock:
+            if self.closed:
+                raise ConnectionError(f"connection to {self.remote_port} is closed")
+            self._pending.append(future)
+            try:
+                self.sock.sendall(frame)
+            except BaseException:
+                self._pending.pop()
+                raise
+
+    def close(self):
+        # shutdown() wakes the reader, which then fails whatever is pending
+        with self._send_lock:
+            self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _read_acks(self):
+        try:
+            with self.sock.makefile('rb') as acks:
+                while acks.read(1) == _ACK:
+                    # send() queues a future before writing its frame, so an
+                    # ack with nothing pending means the peer is out of step
+                    if not self._pending:
+                        log.warning("Unexpected ack from %s, closing connection", self.remote_port)
+                        self.close()
+                        break
+                    _resolve(self._pending.popleft(), True)
+        except (OSError, ValueError):
+            pass
+        finally:
+            # once closed is set no send() can queue another future, so the
+            # drain below fails every frame that will never be acked
+            with self._send_lock:
+                self.closed = True
+                pending = list(self._pending)
+                self._pending.clear()
+            self._on_close(self)
+            for future in pending:
+                _resolve(future, exception=ConnectionError(f"connection to {self.remote_port} closed before ack"))
+
+
+def _merge(a, b):
+    """Merge vector b into vector a in place (element-wise max)."""
+    # measured faster than a[:] = map(max, a, b) or a rebuilt list on
+    # CPython 3.11: only entries that actually grow are written back
+    for i, val in enumerate(b):
+        if val > a[i]:
+            a[i] = val
+
+
+def _compare(a, b):
+    """
+    Compare two vectors in the same layout.
+
+    Returns -1 if a happens before b, 1 if after, 0 if concurrent
+    and None if identical.
+    """
+    less = greater = False
+    for i in range(len(a)):
+        if a[i] < b[i]:
+            less = True
+        elif a[i] > b[i]:
+            greater = True
+        if less and greater:
+            return 0
+    if less:
+        return -1
+    if greater:
+        return 1
+    return None
+
+
+def _swar_ge(a, b, high):
+    """
+    Lane-wise unsigned a >= b for vectors packed into ints.
+
+    high has the top bit of every lane set. Returns an int with the top
+    bit of each lane set where that lane of a is >= the lane of b.
+    """
+    # setting the top bit of a's lanes and clearing b's means no lane can
+    # borrow from its neighbour, so t's top bits compare the low bits
+    t = (a | high) - (b & ~high)
+    return ((a & ~b) | (~(a ^ b) & t)) & high
 
 
 class VectorClock:
+    # most inbound messages merged under one lock acquisition and own bump
+    MAX_BATCH = 64
+
+    def __new__(cls, port, peers=None):
+        # small clusters get the packed variant
+        if cls is VectorClock and len({*(peers or []), port}) <= VectorClockSmall.MAX_NODES:
+            cls = VectorClockSmall
+        return super().__new__(cls)
+
     def __init__(self, port, peers=None):
-        # changed: accept peers and initialize a vector clock (dict)
+        # changed: accept peers and initialize a fixed-size vector clock
         if peers is None:
             peers = []
         self.port = port
         # ensure own port is part of the known nodes
-        nodes = set(peers) | {self.port}
-        self.clock = {p: 0 for p in nodes}
+        nodes = {*peers, self.port}
+        # every process sorts the same node set, so all vectors share one layout
+        self.pid_to_idx = {p: i for i, p in enumerate(sorted(nodes))}
+        self.my_idx = self.pid_to_idx[self.port]
+        self.size = len(nodes)
+        self.clock = [0] * self.size
+        # own entry lives outside self.clock under its own tiny lock, so
+        # bumping it never waits on a merge (self.clock[self.my_idx] is unused)
+        self._tick_lock = threading.Lock()
+        self.own_counter = 0
+        # only guards cross-entry merges into self.clock
         self.lock = threading.Lock()
+        # one persistent outgoing connection per remote port
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        # set once the server thread is running and accepting peers
+        self.started = threading.Event()
+        # inbound (message, future) pairs waiting for the merge worker
+        self._inbox = queue.SimpleQueue()
 
-        # XML-RPC server setup
-        self.server = SimpleXMLRPCServer(('localhost', self.port), allow_none=True)
-        self.server.register_function(self.receive_message, "receive_message")
+        # framed TCP server setup
+        self.server = _FrameServer(('localhost', self.port), _FrameHandler)
+        self.server.vector_clock = self
 
     def receive_message(self, message):
-        # changed: merge incoming vector clocks, then increment own entry
-        with self.lock:
-            incoming = message.get('clock', {})
-            # ensure we include any unknown nodes from incoming message
-            for pid, val in incoming.items():
-                self.clock[pid] = max(self.clock.get(pid, 0), val)
-            # after merge, increment this process's own entry
-            old_clock = dict(self.clock)
-            self.clock[self.port] = self.clock.get(self.port, 0) + 1
-            print(f"Process {self.port}: Received from {message.get('sender_port')} with clock {incoming}, my clock was {old_clock}, clock is now {self.clock}")
-        return True
+        """
+        Queue a received message for merging.
+
+        Returns a concurrent.futures.Future that resolves to True once the
+        message's clock has been merged. Merging is done by the worker
+        started in start().
+        """
+        future = concurrent.futures.Future()
+        self._inbox.put((message, future))
+        return future
+
+    def _merge_inbox(self):
+        # drain whatever has queued up (up to MAX_BATCH) and merge it at once
+        while True:
+            batch = [self._inbox.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self._inbox.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._receive_batch(batch)
+            except Exception as e:
+                # keep the worker alive; only this batch's senders see the error
+                log.exception("Process %s: merging %d messages failed", self.port, len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        _resolve(future, exception=e)
+
+    def _receive_batch(self, batch):
+        # changed: merge incoming vector clocks, then increment own entry once
+        # for the whole batch; the causal order is the same as merging them
+        # one by one, only with fewer own ticks
+        incoming = [self.from_sparse(message.get('clock', (0, []))) for message, _ in batch]
+        debug = log.isEnabledFor(logging.DEBUG)
+        fresh = [clock for clock in incoming if not self._dominated(clock)]
+        if fresh:
+            with self.lock:
+                # only copy what the log line needs, and only if it is emitted
+                old_clock = self._snapshot(self.own_counter) if debug else None
+                for clock in fresh:
+                    self._merge_locked(clock)
+        else:
+            old_clock = self._snapshot(self.own_counter) if debug else None
+        # after merge, increment this process's own entry past anything the
+        # batch carried for it (e.g. from before this process restarted)
+        own = self._tick(max(clock[self.my_idx] for clock in incoming))
+        if debug:
+            if len(batch) == 1:
+                log.debug("Process %s: Received from %s with clock %s, my clock was %s, clock is now %s",
+                          self.port, batch[0][0].get('sender_port'), incoming[0], old_clock, self._snapshot(own))
+            else:
+                senders = sorted({message.get('sender_port') for message, _ in batch})
+                log.debug("Process %s: Received %d messages from %s, my clock was %s, clock is now %s",
+                          self.port, len(batch), senders, old_clock, self._snapshot(own))
+        for _, future in batch:
+            _resolve(future, True)
+
+    def _tick(self, floor=0):
+        """
+        Record a local event and return its value of the own entry. The
+        event comes after floor, the highest own entry seen in a merge.
+        """
+        # read-and-bump under one lock, so own_counter never goes backwards
+        with self._tick_lock:
+            own = max(self.own_counter, floor) + 1
+            self.own_counter = own
+        return own
+
+    def _dominated(self, incoming):
+        """
+        Check whether incoming is element-wise <= this clock, i.e. merging
+        it would change nothing, as for duplicates, echoes and retransmits.
+        Entries only ever grow, so this is safe to check without the lock.
+        The own entry counts too: a peer may hold a higher one from before
+        this process restarted.
+        """
+        clock = self._snapshot(self.own_counter)
+        return all(map(operator.le, incoming, clock))
+
+    def _merge_locked(self, incoming):
+        """Merge an incoming vector into the cross entries; self.lock is held."""
+        _merge(self.clock, incoming)
+
+    def _cross_entries(self):
+        """Return a copy of the stored vector (the own entry is not kept here)."""
+        # list.copy() is atomic, and entries only grow, so even a copy taken
+        # during a merge is a valid (slightly older) view without the lock
+        return self.clock.copy()
+
+    def _snapshot(self, own):
+        """Return a copy of the full vector with own as this process's entry."""
+        clock = self._cross_entries()
+        clock[self.my_idx] = own
+        return clock
+
+    def to_sparse(self, clock=None):
+        """
+        Encode a vector for the wire, omitting entries that are still 0.
+        clock defaults to a snapshot of this process's current clock.
+
+        Returns (bitmap, values) where bit i of bitmap is set iff entry i
+        is non-zero, and values holds those entries in index order.
+        """
+        if clock is None:
+            clock = self._snapshot(self.own_counter)
+        bitmap = 0
+        values = []
+        for i, val in enumerate(clock):
+            if val:
+                bitmap |= 1 << i
+                values.append(val)
+        return bitmap, values
+
+    def from_sparse(self, sparse):
+        """Expand a (bitmap, values) pair from to_sparse() into a full vector."""
+        bitmap, values = sparse
+        clock = [0] * self.size
+        values = iter(values)
+        for i in range(len(clock)):
+            if bitmap >> i & 1:
+                clock[i] = next(values)
+        return clock
+
+    def compare(self, other_clock):
+        """
+        Compare this vector clock with another vector in the same layout.
+
+        Returns:
+            -1: this clock happens before other_clock
+             0: clocks are concurrent
+             1: this clock happens after other_clock
+            None: clocks are identical
+        """
+        return _compare(self._snapshot(self.own_counter), other_clock)
 
     def _increment_clock(self):
         # changed: increment only this process's vector entry
         while True:
-            with self.lock:
-                self.clock[self.port] = self.clock.get(self.port, 0) + 1
-                print(f"Process {self.port}: Internal event, clock is now {self.clock}")
+            own = self._tick()
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Process %s: Internal event, clock is now %s", self.port, self._snapshot(own))
             time.sleep(1)
 
     def send_message(self, remote_port):
-        # changed: send the entire vector clock
-        with xmlrpc.client.ServerProxy(f"http://localhost:{remote_port}/") as remote_server:
-            with self.lock:
-                message = {
-                    'sender_port': self.port,
-                    'clock': dict(self.clock)
-                }
-            try:
-                remote_server.receive_message(message)
-                print(f"Process {self.port}: Sent to {remote_port} with clock {message['clock']}")
-            except ConnectionRefusedError:
-                print(f"Process at {remote_port} is dead!!")
-            except Exception as e:
-                print(f"Error sending to {remote_port}: {e}")
+        """
+        Send this process's clock to remote_port without waiting for it.
+
+        Returns a concurrent.futures.Future that resolves to True once the
+        peer has merged the message, or fails if it could not be delivered.
+        """
+        # changed: send the vector clock, sparse-encoded (ordered by pid_to_idx)
+        # sending is an event; stamping it with a fresh tick guarantees the
+        # message dominates every earlier local event without the merge lock
+        sparse = self.to_sparse(self._snapshot(self._tick()))
+        frame = _encode_message(self.port, sparse, self.size)
+        future = concurrent.futures.Future()
+        future.add_done_callback(lambda f: self._log_sent(f, remote_port, sparse))
+        try:
+            conn = self._connection(remote_port)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        try:
+            conn.send(frame, future)
+        except Exception as e:
+            # drop this connection only; another sender may have replaced it
+            self._forget_connection(conn)
+            conn.close()
+            future.set_exception(e)
+        return future
+
+    def _log_sent(self, future, remote_port, sparse):
+        e = future.exception()
+        if e is None:
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Process %s: Sent to %s with clock %s", self.port, remote_port, self.from_sparse(sparse))
+        elif isinstance(e, ConnectionRefusedError):
+            log.warning("Process at %s is dead!!", remote_port)
+        else:
+            log.error("Error sending to %s: %s", remote_port, e)
+
+    def _connection(self, remote_port):
+        """Return the cached connection to remote_port, connecting on first use."""
+        # connecting under the lock keeps concurrent senders from each
+        # opening (and leaking) their own connection to the same peer
+        with self._connections_lock:
+            conn = self._connections.get(remote_port)
+            if conn is None:
+                conn = _PeerConnection(remote_port, self._forget_connection)
+                self._connections[remote_port] = conn
+            return conn
+
+    def _forget_connection(self, conn):
+        # called once a connection has gone away, also by its reader thread
+        with self._connections_lock:
+            if self._connections.get(conn.remote_port) is conn:
+                del self._connections[conn.remote_port]
 
 
     def start(self):
         # ...existing code...
-        server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        server_thread = threading.Thread(target=self._serve, daemon=True)
         increment_thread = threading.Thread(target=self._increment_clock, daemon=True)
+        merge_thread = threading.Thread(target=self._merge_inbox, daemon=True)
 
+        merge_thread.start()
         server_thread.start()
         increment_thread.start()
 
-        print(f"Process on port {self.port} started...")
+        log.info("Process on port %s started...", self.port)
+
+    def _serve(self):
+        # the socket has been listening since __init__; started tells the
+        # driver that the serving thread is now running and accepting frames
+        self.started.set()
+        self.server.serve_forever()
+
+
+class VectorClockSmall(VectorClock):
+    """
+    VectorClock for up to 8 nodes, with the stored vector packed into a
+    single 64-bit int of 64 // n bits per lane (8 bits at 8 nodes, 16 at
+    4). Merge and compare become a few integer ops (SWAR). A counter that
+    outgrows its lane widens the clock back to a list for good.
+    """
+
+    MAX_NODES = 8
+
+    def __init__(self, port, peers=None):
+        super().__init__(port, peers)
+        self.lane_bits = 64 // self.size
+        self.lane_max = (1 << self.lane_bits) - 1
+        self.high = sum(1 << (i * self.lane_bits + self.lane_bits - 1) for i in range(self.size))
+        # None once widened; the own lane is always 0, like self.clock[self.my_idx]
+        self.packed = 0
+
+    def _pack(self, clock):
+        packed = 0
+        for i, val in enumerate(clock):
+            if i != self.my_idx:
+                packed |= val << (i * self.lane_bits)
+        return packed
+
+    def _unpack(self, packed):
+        bits, lane_max = self.lane_bits, self.lane_max
+        return [(packed >> (i * bits)) & lane_max for i in range(self.size)]
+
+    def _fits(self, clock):
+        # a negative value would borrow from the neighbouring lane
+        return all(0 <= val <= self.lane_max for i, val in enumerate(clock) if i != self.my_idx)
+
+    def _dominated(self, incoming):
+        packed = self.packed
+        if packed is None:
+            return super()._dominated(incoming)
+        # the own lane is 0 on both sides, so the own entry is checked apart
+        return (incoming[self.my_idx] <= self.own_counter and self._fits(incoming)
+                and _swar_ge(packed, self._pack(incoming), self.high) == self.high)
+
+    def _merge_locked(self, incoming):
+        a = self.packed
+        if a is None:
+            return super()._merge_locked(incoming)
+        if not self._fits(incoming):
+            # counters outgrew the lanes: move to the list representation
+            self.clock = self._unpack(a)
+            self.packed = None
+            return super()._merge_locked(incoming)
+        b = self._pack(incoming)
+        mask = (_swar_ge(a, b, self.high) >> (self.lane_bits - 1)) * self.lane_max
+        self.packed = (a & mask) | (b & ~mask)
+
+    def _cross_entries(self):
+        packed = self.packed
+        if packed is None:
+            return super()._cross_entries()
+        return self._unpack(packed)
+
+    def compare(self, other_clock):
+        packed = self.packed
+        own = self.own_counter
+        if (packed is None or own > self.lane_max or not 0 <= other_clock[self.my_idx] <= self.lane_max
+                or not self._fits(other_clock)):
+            return super().compare(other_clock)
+        shift = self.my_idx * self.lane_bits
+        a = packed | (own << shift)
+        b = self._pack(other_clock) | (other_clock[self.my_idx] << shift)
+        diff = a ^ b
+        mask = (_swar_ge(a, b, self.high) >> (self.lane_bits - 1)) * self.lane_max
+        greater = diff & mask != 0
+        less = diff & ~mask != 0
+        if less and greater:
+            return 0
+        if less:
+            return -1
+        if greater:
+            return 1
+        return None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # the queue never leaves this process, so hand the record over as-is
+        # and let the listener thread do the formatting
+        return record
+
+
+def _start_log_listener():
+    """Route logging through a queue so formatting and stdout writes happen
+    on the listener thread instead of the clock threads."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    root = logging.getLogger()
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(logging.DEBUG)
+    listener.start()
+    return listener
 
 
 if __name__ == "__main__":
+    listener = _start_log_listener()
+
     # changed: demonstrate with known peers so vector has proper entries
     vector_process = VectorClock(8001, peers=[8001, 8002, 8003])
     vector_process.start()
+    vector_process.started.wait()
+
+    # each send waits for the previous one to be delivered (or to fail)
+    log.info("\n--- Sending message from 8001 to 8002. ---")
+    concurrent.futures.wait([vector_process.send_message(8002)])
 
-    time.sleep(3)  # Wait for clocks to increment
-    print("\n--- Sending message from 8001 to 8002. ---")
-    vector_process.send_message(8002)
+    log.info("\n--- Sending message from 8001 to 8003. ---")
+    concurrent.futures.wait([vector_process.send_message(8003)])
 
-    time.sleep(10)
-    print("\n--- Sending message from 8001 to 8003. ---")
-    vector_process.send_message(8003)
+    log.info("\n--- Sending message from 8001 to 8002. ---")
+    concurrent.futures.wait([vector_process.send_message(8002)])
 
-    time.sleep(2)
-    print("\n--- Sending message from 8001 to 8002. ---")
-    vector_process.send_message(8002)
+    listener.stop()
 